@@ -0,0 +1,253 @@
+# __main__.py
+
+"""
+Command-line entry point for headless runs and sweeps:
+
+    python -m covid_19_model run -f fixed_parameters.json -v variable_parameters.json
+    python -m covid_19_model sweep publish -q sweep.db -f fixed_parameters.json -v variable_parameters_*.json
+    python -m covid_19_model sweep work -q sweep.db
+    python -m covid_19_model sweep status -q sweep.db
+    python -m covid_19_model summarize -o output/exp_0_summary.npz output/exp_0_SEIR_run_*.pkl
+    python -m covid_19_model calibrate -f fixed_parameters.json -v variable_parameters.json \
+        --observed observed.json --parameter transmission_rate 0.5 2.0 -o output/calibration.npz
+    python -m covid_19_model population -f fixed_parameters.json -v variable_parameters.json -o population.npy
+
+Modules are imported by the command that needs them, so that the server,
+visualization and progress bar modules are never loaded by headless runs.
+"""
+
+import argparse
+import sys
+
+def get_model(processes):
+    """Returns the model class to run"""
+    if processes is None:
+        from covid_19_model.model import Covid19Model
+        return Covid19Model
+
+    from covid_19_model.partition import PartitionedCovid19Model
+
+    return type(
+        PartitionedCovid19Model.__name__,
+        (PartitionedCovid19Model,),
+        {"PROCESSES": processes})
+
+def get_cache(args):
+    if args.cache is None:
+        return None
+    from covid_19_model.cache import ResultCache
+    return ResultCache(args.cache, args.cache_size * 1024 ** 2)
+
+def run(args):
+    from covid_19_model.batch import batchrun, stopping_state
+    from covid_19_model.utils import parse_json
+
+    model_params = {
+        "fixed_params": parse_json(args.fixed),
+        "variable_params": parse_json(args.variable),
+    }
+    batchrun(
+        get_model(args.processes),
+        model_params,
+        args.runs,
+        args.steps,
+        stopping_state,
+        experiment_id = args.experiment_id,
+        seed = args.seed,
+        output_dir = args.output_dir,
+        cache = get_cache(args),
+        show_progress = not args.quiet,
+        event_logs = args.event_log,
+        population = args.population)
+
+def sweep_publish(args):
+    from covid_19_model.sweep import SQLiteJobQueue, publish_sweep
+    from covid_19_model.utils import parse_json
+
+    fixed_params = parse_json(args.fixed)
+    experiments = [
+        {"fixed_params": fixed_params, "variable_params": parse_json(filename)}
+        for filename in args.variable]
+
+    queue = SQLiteJobQueue(args.queue, max_attempts=args.max_attempts)
+    job_ids = publish_sweep(queue, experiments, args.runs, args.steps, seed=args.seed)
+    print("Published %i jobs to %s" % (len(job_ids), args.queue))
+
+def sweep_work(args):
+    from covid_19_model.sweep import SQLiteJobQueue, work
+
+    jobs_run = work(
+        SQLiteJobQueue(args.queue),
+        get_model(args.processes),
+        output_dir = args.output_dir,
+        lease_time = args.lease_time,
+        poll_interval = args.poll_interval,
+        cache = get_cache(args))
+    print("Jobs run: %i" % (jobs_run))
+
+def sweep_status(args):
+    from covid_19_model.sweep import SQLiteJobQueue
+
+    for status, count in SQLiteJobQueue(args.queue).counts().items():
+        print("%s: %i" % (status, count))
+
+def summarize(args):
+    from covid_19_model.statistics import summarize
+
+    summarize(args.runs, args.output)
+    print("File saved: %s" % (args.output))
+
+def calibrate(args):
+    from covid_19_model.calibration import Calibration
+    from covid_19_model.model import Covid19Model
+    from covid_19_model.utils import parse_json
+    import numpy as np
+
+    calibration = Calibration(
+        Covid19Model,
+        parse_json(args.fixed),
+        parse_json(args.variable),
+        dict((name, (float(low), float(high))) for name, low, high in args.parameter),
+        parse_json(args.observed),
+        compartment = args.compartment,
+        workers = args.workers,
+        check_every = args.check_every,
+        cache = get_cache(args),
+        seed = args.seed)
+    result = calibration.run(
+        population_size = args.population_size,
+        generations = args.generations,
+        quantile = args.quantile,
+        max_simulations = args.max_simulations)
+
+    np.savez(args.output, **result)
+    print("File saved: %s" % (args.output))
+    for i, name in enumerate(result["parameters"]):
+        mean = np.average(result["particles"][:, i], weights=result["weights"])
+        print("%s multiplier: %f" % (name, mean))
+
+def population(args):
+    from covid_19_model.population import build_population, save_population
+    from covid_19_model.utils import parse_json
+
+    population = build_population(
+        parse_json(args.variable),
+        parse_json(args.fixed),
+        seed = args.seed,
+        mean_household_size = args.mean_household_size)
+    save_population(args.output, population)
+    print("File saved: %s (%i agents)" % (args.output, len(population)))
+
+def add_model_arguments(parser):
+    parser.add_argument("--processes", type=int, default=None,
+        help="partitions each run by district across this many processes")
+    parser.add_argument("--cache", default=None, metavar="DIRECTORY",
+        help="caches the output of seeded runs in this directory")
+    parser.add_argument("--cache-size", type=int, default=2048, metavar="MB",
+        help="maximum size of the cache (default: 2048)")
+    parser.add_argument("-o", "--output-dir", default="output")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog = "python -m covid_19_model",
+        description = "COVID-19 Agent-Based Model for Quezon City, Philippines")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="runs an experiment")
+    run_parser.add_argument("-f", "--fixed", required=True, help="fixed parameters file")
+    run_parser.add_argument("-v", "--variable", required=True, help="variable parameters file")
+    run_parser.add_argument("-s", "--steps", type=int, default=150)
+    run_parser.add_argument("-r", "--runs", type=int, default=10)
+    run_parser.add_argument("--seed", type=int, default=None,
+        help="seed of the first run; run i uses seed + i")
+    run_parser.add_argument("-e", "--experiment-id", type=int, default=0)
+    run_parser.add_argument("--quiet", action="store_true", help="hides the progress bar")
+    run_parser.add_argument("--event-log", action="store_true",
+        help="logs the agents' transitions of each run (cannot be used with --processes)")
+    run_parser.add_argument("--population", default=None,
+        help="population file to start every run from (see the population command)")
+    add_model_arguments(run_parser)
+    run_parser.set_defaults(function=run)
+
+    sweep_parser = commands.add_parser("sweep", help="runs a sweep through a job queue")
+    sweep_commands = sweep_parser.add_subparsers(dest="sweep_command")
+    sweep_commands.required = True
+
+    publish_parser = sweep_commands.add_parser("publish", help="publishes the jobs of a sweep")
+    publish_parser.add_argument("-q", "--queue", required=True, help="queue database file")
+    publish_parser.add_argument("-f", "--fixed", required=True, help="fixed parameters file")
+    publish_parser.add_argument("-v", "--variable", required=True, nargs="+",
+        help="variable parameters files, one experiment each")
+    publish_parser.add_argument("-s", "--steps", type=int, default=150)
+    publish_parser.add_argument("-r", "--runs", type=int, default=10)
+    publish_parser.add_argument("--seed", type=int, default=0)
+    publish_parser.add_argument("--max-attempts", type=int, default=3)
+    publish_parser.set_defaults(function=sweep_publish)
+
+    work_parser = sweep_commands.add_parser("work", help="runs jobs until the queue is empty")
+    work_parser.add_argument("-q", "--queue", required=True, help="queue database file")
+    work_parser.add_argument("--lease-time", type=float, default=3600,
+        help="seconds before an unfinished job is given to another worker")
+    work_parser.add_argument("--poll-interval", type=float, default=None,
+        help="waits for new jobs, polling every given seconds, instead of stopping")
+    add_model_arguments(work_parser)
+    work_parser.set_defaults(function=sweep_work)
+
+    status_parser = sweep_commands.add_parser("status", help="prints the number of jobs per status")
+    status_parser.add_argument("-q", "--queue", required=True, help="queue database file")
+    status_parser.set_defaults(function=sweep_status)
+
+    summarize_parser = commands.add_parser("summarize", help="computes the statistics of saved runs")
+    summarize_parser.add_argument("runs", nargs="+", help="output files of the runs")
+    summarize_parser.add_argument("-o", "--output", required=True, help="summary file (.npz)")
+    summarize_parser.set_defaults(function=summarize)
+
+    calibrate_parser = commands.add_parser("calibrate",
+        help="fits parameter multipliers to observed district series (ABC-SMC)")
+    calibrate_parser.add_argument("-f", "--fixed", required=True, help="fixed parameters file")
+    calibrate_parser.add_argument("-v", "--variable", required=True, help="variable parameters file")
+    calibrate_parser.add_argument("--observed", required=True,
+        help="JSON file of district name to observed series, one value per step")
+    calibrate_parser.add_argument("--parameter", required=True, nargs=3, action="append",
+        metavar=("NAME", "MIN", "MAX"), help="fixed parameter to fit and its multiplier's bounds")
+    calibrate_parser.add_argument("--compartment", default="I", choices=list("SEIR"))
+    calibrate_parser.add_argument("--population-size", type=int, default=100)
+    calibrate_parser.add_argument("--generations", type=int, default=5)
+    calibrate_parser.add_argument("--quantile", type=float, default=0.5,
+        help="quantile of the distances used as the next generation's tolerance")
+    calibrate_parser.add_argument("--check-every", type=int, default=10,
+        help="steps between checks of partial distances")
+    calibrate_parser.add_argument("--max-simulations", type=int, default=None,
+        help="stops with an error after running this many candidates")
+    calibrate_parser.add_argument("--workers", type=int, default=None,
+        help="number of processes running candidates (default: number of CPUs)")
+    calibrate_parser.add_argument("--cache", default=None, metavar="DIRECTORY",
+        help="caches the distances of evaluated candidates in this directory (requires --seed)")
+    calibrate_parser.add_argument("--cache-size", type=int, default=2048, metavar="MB")
+    calibrate_parser.add_argument("--seed", type=int, default=None)
+    calibrate_parser.add_argument("-o", "--output", required=True, help="result file (.npz)")
+    calibrate_parser.set_defaults(function=calibrate)
+
+    population_parser = commands.add_parser("population",
+        help="builds an initial population with households and saves it")
+    population_parser.add_argument("-f", "--fixed", required=True, help="fixed parameters file")
+    population_parser.add_argument("-v", "--variable", required=True, help="variable parameters file")
+    population_parser.add_argument("--seed", type=int, default=None)
+    population_parser.add_argument("--mean-household-size", type=float, default=4.0)
+    population_parser.add_argument("-o", "--output", required=True, help="population file (.npy)")
+    population_parser.set_defaults(function=population)
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.event_log and args.processes is not None:
+        run_parser.error("--event-log is not supported with --processes")
+    if args.command == "calibrate" and args.cache is not None and args.seed is None:
+        calibrate_parser.error("--cache requires --seed, so that a resumed calibration draws the same candidates")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.function(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
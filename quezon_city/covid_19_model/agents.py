@@ -1,6 +1,7 @@
 # agents.py
 
 from covid_19_model.enum.immunity import Immunity
+from covid_19_model.enum.outcome import Outcome
 from covid_19_model.enum.state import State
 from covid_19_model.utils import coin_toss
 from mesa_geo.geoagent import GeoAgent
@@ -21,6 +22,7 @@ class PersonAgent(GeoAgent):
         wearing_mask: True if agent is wearing a mask; else, False
         physical_distancing: True if agent is observing physical distance; else, False
         mobile_worker: True if agent is a mobile worker; else, False
+        household: Agent's household number, if the population has households
     """
 
     def __init__(
@@ -35,6 +37,7 @@ class PersonAgent(GeoAgent):
         wearing_mask,
         physical_distancing,
         mobile_worker,
+        household=None,
     ):
         """Initializes PersonAgent"""
         super().__init__(unique_id, model, shape)
@@ -45,6 +48,7 @@ class PersonAgent(GeoAgent):
         self.wearing_mask = wearing_mask
         self.physical_distancing = physical_distancing
         self.mobile_worker = mobile_worker
+        self.household = household
         self.days_infected = 0
         self.days_incubating = 0
 
@@ -76,7 +80,8 @@ class PersonAgent(GeoAgent):
                         district = self.district,
                         age_group = self.age_group,
                         prev_state = self.state,
-                        next_state = State.REMOVED)
+                        next_state = State.REMOVED,
+                        outcome = Outcome.DEAD)
 
                     self.model.total_summary.at["total_dead", self.district] += 1
                     self.model.dead.at[self.age_group, self.district] += 1
@@ -91,7 +96,8 @@ class PersonAgent(GeoAgent):
                         district = self.district,
                         age_group = self.age_group,
                         prev_state = self.state,
-                        next_state = State.REMOVED)
+                        next_state = State.REMOVED,
+                        outcome = Outcome.RECOVERED)
 
                     self.model.total_summary.at["total_recovered", self.district] += 1
                     self.model.recovered.at[self.age_group, self.district] += 1
@@ -124,7 +130,8 @@ class PersonAgent(GeoAgent):
                             prev_state = neighbor.state,
                             next_state = State.EXPOSED,
                             update_summary = True,
-                            summary_key = "max_exposed")
+                            summary_key = "max_exposed",
+                            source = self)
                         neighbor.model.total_summary.at["total_exposed", neighbor.district] += 1
 
     def move(self):
@@ -174,8 +181,25 @@ class PersonAgent(GeoAgent):
         """Set agent's state"""
         self.state = state
 
-    def transition(self, district, age_group, prev_state, next_state, update_summary=False, summary_key=""):
-        """Change's agent's state"""
+    def transition(
+        self,
+        district,
+        age_group,
+        prev_state,
+        next_state,
+        update_summary=False,
+        summary_key="",
+        source=None,
+        outcome=None,
+    ):
+        """
+        Change's agent's state; source is the agent that caused the change, if
+        any, and outcome tells whether a removed agent died or recovered
+        """
+        if self.model.event_log is not None:
+            self.model.event_log.record(
+                self.model.steps, self, source, prev_state, next_state, outcome)
+
         self.set_state(next_state)
         self.model.add_one(district, age_group, next_state)
         self.model.remove_one(district, age_group, prev_state)
@@ -0,0 +1,166 @@
+# batch.py
+
+"""
+Functions that run the model for a number of iterations and save its output.
+"""
+
+from covid_19_model.cache import cache_key
+from covid_19_model.event_log import EventLog
+from covid_19_model.statistics import EnsembleStatistics
+import numpy as np
+import os
+import pickle
+
+def stopping_state(model):
+    return model.get_SEIR("total")[1] <= 0 and model.get_SEIR("total")[2] <= 0
+
+def run_model(
+    model,
+    model_params,
+    max_iterations,
+    seed=None,
+    show_progress=True,
+    cache=None,
+    event_log_filename=None,
+    population=None,
+):
+    """
+    Runs one instance of the model and returns its output data. Seeded runs
+    are served from the cache, if given, when they were run before. If an
+    event log filename is given, the agents' transitions are logged to it
+    (see event_log.py). If a population filename is given, the model loads
+    its agents from it (see population.py). The cache is not used in either case.
+    """
+    key = None
+    if cache is not None and seed is not None and event_log_filename is None and population is None:
+        key = cache_key(model, model_params, seed, max_iterations)
+        output_data = cache.get(key)
+        if output_data is not None:
+            return output_data
+
+    # Instantiates model
+    options = {}
+    event_log = None
+    if event_log_filename is not None:
+        event_log = options["event_log"] = EventLog(event_log_filename)
+    if population is not None:
+        options["population"] = population
+
+    # The event log is closed even if the run fails
+    try:
+        model_instance = model(
+            model_params["variable_params"],
+            model_params["fixed_params"],
+            seed = seed,
+            **options)
+
+        # SEIR per age group and district, recorded along with the data collectors
+        age_group_SEIR = np.zeros((max_iterations, 4, 9, 6), dtype=np.int32)
+
+        progress = None
+        if show_progress:
+            # Imported here so that headless runs do not load the progress bars
+            from progress.bar import Bar
+            progress = Bar("Running model", max = max_iterations)
+
+        for i in range(max_iterations):
+            for j, compartment in enumerate("SEIR"):
+                age_group_SEIR[i, j] = model_instance.SEIR[compartment].values
+            model_instance.step()
+            if progress:
+                progress.next()
+        if progress:
+            progress.finish()
+    finally:
+        if event_log is not None:
+            event_log.close()
+
+    output_data = {
+        "district1": model_instance.data_collector_1.get_model_vars_dataframe(),
+        "district2": model_instance.data_collector_2.get_model_vars_dataframe(),
+        "district3": model_instance.data_collector_3.get_model_vars_dataframe(),
+        "district4": model_instance.data_collector_4.get_model_vars_dataframe(),
+        "district5": model_instance.data_collector_5.get_model_vars_dataframe(),
+        "district6": model_instance.data_collector_6.get_model_vars_dataframe(),
+        "age_group_SEIR": age_group_SEIR,
+        "steps": model_instance.steps,
+        "max_summary": model_instance.max_summary,
+        "total_summary": model_instance.total_summary,
+        "dead": model_instance.dead,
+        "recovered": model_instance.recovered,
+    }
+
+    del model_instance
+
+    if key is not None:
+        cache.put(key, output_data)
+    return output_data
+
+def save_output(output_data, output_filename):
+    """
+    Pickles output data. The file is written under a temporary name and then
+    renamed, so readers never see a partially written file.
+    """
+    temporary_filename = "%s.%i.tmp" % (output_filename, os.getpid())
+    with open(temporary_filename, "wb") as output_file:
+        pickle.dump(output_data, output_file, -1) # -1 specifies highest binary protocol
+    os.replace(temporary_filename, output_filename)
+
+def output_filename(output_dir, experiment_id, run):
+    return os.path.join(output_dir, "exp_%i_SEIR_run_%i.pkl" % (experiment_id, run))
+
+def event_log_filename(output_dir, experiment_id, run):
+    return os.path.join(output_dir, "exp_%i_events_run_%i.bin" % (experiment_id, run))
+
+def summary_filename(output_dir, experiment_id):
+    return os.path.join(output_dir, "exp_%i_summary.npz" % (experiment_id))
+
+def batchrun(
+    model,
+    model_params,
+    runs,
+    max_iterations,
+    stopping_state,
+    experiment_id,
+    seed=None,
+    output_dir="output",
+    cache=None,
+    show_progress=True,
+    event_logs=False,
+    population=None,
+):
+    """
+    Runs the model several times and saves the output of each run, along with
+    the ensemble statistics of the runs (see statistics.py). If event_logs is
+    True, the transitions of each run are also logged (see event_log.py). If
+    a population filename is given, every run starts from that population.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    statistics = EnsembleStatistics()
+
+    for run in range(runs):
+        print("Run %i of %i" % ((run + 1), runs))
+
+        output_data = run_model(
+            model,
+            model_params,
+            max_iterations,
+            seed = None if seed is None else seed + run,
+            show_progress = show_progress,
+            cache = cache,
+            event_log_filename = event_log_filename(output_dir, experiment_id, run) if event_logs else None,
+            population = population)
+
+        # Save data
+        filename = output_filename(output_dir, experiment_id, run)
+        save_output(output_data, filename)
+        print("File saved: %s" % (filename))
+
+        statistics.update(output_data)
+        del output_data
+
+    filename = summary_filename(output_dir, experiment_id)
+    statistics.save(filename)
+    print("File saved: %s" % (filename))
+
+    print("Batch run finished.")
@@ -0,0 +1,87 @@
+# cache.py
+
+"""
+On-disk cache of simulation outputs.
+
+Runs are keyed by a hash of the model class, version and options, the fixed
+and variable parameters, the seed and the number of steps, so identical runs
+are computed only once. The cache is bounded in size: when it grows past
+max_bytes, the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+# Changes whenever the layout of the cached output data changes
+CACHE_VERSION = 2
+
+def cache_key(model, model_params, seed, max_iterations):
+    """Returns the key of a run of the model"""
+    content = json.dumps({
+        "cache_version": CACHE_VERSION,
+        "model": model.__name__,
+        "model_version": model.VERSION,
+        "model_options": model.cache_options(),
+        "fixed_params": model_params["fixed_params"],
+        "variable_params": model_params["variable_params"],
+        "seed": seed,
+        "max_iterations": max_iterations,
+    }, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Size-bounded, least recently used cache of output data"""
+
+    def __init__(self, directory="output/cache", max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """Returns the cached output data, or None if it is not cached"""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as cache_file:
+                output_data = pickle.load(cache_file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # The modification time records the last use of the entry
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted meanwhile by another process sharing the cache
+            pass
+        return output_data
+
+    def put(self, key, output_data):
+        """Caches output data, then evicts entries if the cache is too large"""
+        path = self.path(key)
+        temporary_path = "%s.%i.tmp" % (path, os.getpid())
+        with open(temporary_path, "wb") as cache_file:
+            pickle.dump(output_data, cache_file, -1)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -0,0 +1,248 @@
+# calibration.py
+
+"""
+Calibration of fixed parameters against observed district series with
+approximate Bayesian computation by sequential Monte Carlo (ABC-SMC).
+
+Each calibrated parameter is given a multiplier with a uniform prior; a
+candidate scales the parameter's values (a number, a district dictionary or
+an age group by district matrix) by its multiplier. The distance between a
+run and the observed data is the sum of squared errors of a compartment over
+all observed districts and steps. Since it can only grow as the run goes on,
+runs whose partial distance already exceeds the tolerance are stopped early.
+
+Candidates are run in parallel. Each candidate's seed is derived from its
+multipliers, so its distance can be cached and an interrupted calibration
+resumes without re-running evaluated candidates.
+"""
+
+from covid_19_model.cache import cache_key
+import copy
+import functools
+import hashlib
+import json
+import multiprocessing
+import numpy as np
+
+def scale(value, factor):
+    """Multiplies a parameter value (number, dictionary or nested list) by factor"""
+    if isinstance(value, dict):
+        return dict((key, scale(item, factor)) for key, item in value.items())
+    if isinstance(value, list):
+        return [scale(item, factor) for item in value]
+    return value * factor
+
+def apply_multipliers(fixed_params, names, multipliers):
+    """Returns a copy of the fixed parameters with the multipliers applied"""
+    fixed_params = copy.deepcopy(fixed_params)
+    for name, multiplier in zip(names, multipliers):
+        fixed_params[name] = scale(fixed_params[name], float(multiplier))
+    return fixed_params
+
+def simulate(model, variable_params, observed, compartment, check_every, candidate):
+    """
+    Runs a candidate (fixed_params, seed, epsilon) and returns its distance and
+    whether the run was completed. An incomplete run was stopped early and its
+    distance is only a lower bound, greater than epsilon.
+    """
+    fixed_params, seed, epsilon = candidate
+    steps = len(next(iter(observed.values())))
+    model_instance = model(variable_params, fixed_params, seed=seed)
+
+    distance = 0.0
+    for i in range(steps):
+        # Same values as the data collectors' row i
+        for district, series in observed.items():
+            error = model_instance.SEIR[compartment][district].sum() - series[i]
+            distance += error * error
+
+        if distance > epsilon and (i + 1) % check_every == 0:
+            return distance, False
+        if i < steps - 1:
+            model_instance.step()
+
+    return distance, True
+
+class Calibration:
+    """
+    ABC-SMC calibration of parameter multipliers.
+
+    Properties:
+        model: Model class to calibrate
+        fixed_params, variable_params: Model parameters
+        priors: Dictionary of parameter name to (min, max) multiplier
+        observed: Dictionary of district to observed series, one value per step
+        compartment: Compartment compared to the observed series: S, E, I, or R
+        workers: Number of processes running candidates
+        check_every: Steps between checks of partial distances
+        cache: Optional ResultCache of evaluated candidates
+        seed: Seed of the particles and, with their multipliers, of the runs
+        simulations: Number of candidates run so far
+    """
+
+    def __init__(
+        self,
+        model,
+        fixed_params,
+        variable_params,
+        priors,
+        observed,
+        compartment="I",
+        workers=None,
+        check_every=10,
+        cache=None,
+        seed=None,
+    ):
+        self.model = model
+        self.fixed_params = fixed_params
+        self.variable_params = variable_params
+        self.names = list(priors)
+        self.lower = np.array([priors[name][0] for name in self.names], dtype=float)
+        self.upper = np.array([priors[name][1] for name in self.names], dtype=float)
+        self.observed = observed
+        self.compartment = compartment
+        self.workers = workers or multiprocessing.cpu_count()
+        self.check_every = check_every
+        self.cache = cache
+        self.random = np.random.default_rng(seed)
+        self.seed = int(self.random.integers(2 ** 31)) if seed is None else seed
+        self.simulations = 0
+
+        content = json.dumps({"observed": observed, "compartment": compartment}, sort_keys=True)
+        self.observed_key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def candidate_key(self, fixed_params, seed):
+        model_params = {"fixed_params": fixed_params, "variable_params": self.variable_params}
+        steps = len(next(iter(self.observed.values())))
+        key = cache_key(self.model, model_params, seed, steps) + self.observed_key
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def candidate_seed(self, particle):
+        """Returns the seed of a particle's run, derived from its multipliers"""
+        content = np.asarray(particle, dtype="<f8").tobytes() + str(self.seed).encode("utf-8")
+        return int(hashlib.sha256(content).hexdigest()[:8], 16) % 2 ** 31
+
+    def evaluate(self, pool, particles, epsilon):
+        """Returns the distances of the particles and whether each is within epsilon"""
+        candidates = []
+        keys = []
+        distances = np.full(len(particles), np.inf)
+        pending = []
+
+        for i, particle in enumerate(particles):
+            fixed_params = apply_multipliers(self.fixed_params, self.names, particle)
+            seed = self.candidate_seed(particle)
+
+            if self.cache is not None:
+                key = self.candidate_key(fixed_params, seed)
+                cached = self.cache.get(key)
+                # Stopped runs are only reused if they are rejected by epsilon too
+                if cached is not None and (cached["complete"] or cached["distance"] > epsilon):
+                    distances[i] = cached["distance"]
+                    continue
+                keys.append(key)
+
+            candidates.append((fixed_params, seed, epsilon))
+            pending.append(i)
+
+        run = functools.partial(
+            simulate,
+            self.model,
+            self.variable_params,
+            self.observed,
+            self.compartment,
+            self.check_every)
+        results = pool.map(run, candidates) if pool else list(map(run, candidates))
+        self.simulations += len(candidates)
+
+        for j, (i, (distance, complete)) in enumerate(zip(pending, results)):
+            distances[i] = distance
+            if self.cache is not None:
+                self.cache.put(keys[j], {"distance": distance, "complete": complete})
+
+        return distances, distances <= epsilon
+
+    def sample_prior(self, size):
+        return self.random.uniform(self.lower, self.upper, size=(size, len(self.names)))
+
+    def perturb(self, particles, weights, size):
+        """Samples particles by weight and moves them with a Gaussian kernel"""
+        covariance = 2 * np.atleast_2d(np.cov(particles, rowvar=False, aweights=weights))
+        proposals = np.empty((0, len(self.names)))
+
+        # Proposals outside the prior's bounds are drawn again
+        while len(proposals) < size:
+            index = self.random.choice(len(particles), size=size, p=weights)
+            moved = self.random.multivariate_normal(np.zeros(len(self.names)), covariance, size=size)
+            moved += particles[index]
+            inside = np.all((moved >= self.lower) & (moved <= self.upper), axis=1)
+            proposals = np.concatenate([proposals, moved[inside]])
+
+        return proposals[:size], covariance
+
+    def run(
+        self,
+        population_size=100,
+        generations=5,
+        quantile=0.5,
+        batch_size=None,
+        max_simulations=None,
+    ):
+        """
+        Runs the calibration and returns a dictionary of the final particles,
+        their weights and distances, and the tolerance of each generation.
+        Raises RuntimeError if more than max_simulations candidates are run
+        (cached candidates are not counted), e.g. when few proposals are
+        accepted.
+        """
+        batch_size = batch_size or self.workers * 2
+        pool = multiprocessing.Pool(self.workers) if self.workers > 1 else None
+
+        try:
+            # First generation: samples from the prior, without tolerance
+            particles = self.sample_prior(population_size)
+            distances, _ = self.evaluate(pool, particles, np.inf)
+            weights = np.full(population_size, 1 / population_size)
+            epsilons = [np.inf]
+
+            for generation in range(1, generations):
+                epsilon = np.quantile(distances, quantile)
+                accepted = []
+                accepted_distances = []
+
+                while len(accepted) < population_size:
+                    proposals, covariance = self.perturb(particles, weights, batch_size)
+                    proposal_distances, within = self.evaluate(pool, proposals, epsilon)
+                    accepted.extend(proposals[within])
+                    accepted_distances.extend(proposal_distances[within])
+
+                    if max_simulations is not None and self.simulations > max_simulations:
+                        raise RuntimeError(
+                            "Calibration stopped after %i simulations: %i of %i particles "
+                            "accepted in generation %i (tolerance %g)"
+                            % (self.simulations, len(accepted), population_size, generation, epsilon))
+
+                new_particles = np.array(accepted[:population_size])
+                distances = np.array(accepted_distances[:population_size])
+
+                # Uniform priors: weights are inversely proportional to the
+                # probability of proposing each particle
+                precision = np.linalg.pinv(covariance)
+                differences = new_particles[:, None, :] - particles[None, :, :]
+                kernel = np.exp(-0.5 * np.einsum("ijk,kl,ijl->ij", differences, precision, differences))
+                new_weights = 1 / (kernel @ weights)
+                weights = new_weights / new_weights.sum()
+                particles = new_particles
+                epsilons.append(epsilon)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        return {
+            "parameters": self.names,
+            "particles": particles,
+            "weights": weights,
+            "distances": distances,
+            "epsilons": np.array(epsilons),
+        }
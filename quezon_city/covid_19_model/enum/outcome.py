@@ -0,0 +1,3 @@
+class Outcome:
+    DEAD = "D"
+    RECOVERED = "R"
\ No newline at end of file
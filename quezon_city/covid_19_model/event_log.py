@@ -0,0 +1,106 @@
+# event_log.py
+
+"""
+Binary log of the agents' state transitions.
+
+Each transition is a fixed-width record (see EVENT_DTYPE) written into an
+in-memory chunk, and chunks are appended to the log file when full. The file
+has no header, so it can be memory-mapped with read_event_log() to rebuild
+transmission chains after the run.
+"""
+
+import numpy as np
+
+EVENT_DTYPE = np.dtype([
+    ("step", "<u4"),
+    ("agent_id", "S24"),
+    ("source_id", "S24"), # empty if the transition has no source agent
+    ("district", "u1"),   # 0 to 5 for district1 to district6
+    ("age_group", "u1"),  # 0 to 8 for 0 to 9, ..., 80+
+    ("x", "<f8"),
+    ("y", "<f8"),
+    ("old_state", "S1"),
+    ("new_state", "S1"),
+    ("outcome", "S1"),    # D if dead, R if recovered, empty otherwise
+])
+
+DISTRICTS = ["district%i" % (i+1) for i in range(6)]
+AGE_GROUPS = ["%i to %i" % (i * 10, i * 10 + 9) for i in range(8)] + ["80+"]
+DISTRICT_INDEX = dict((district, i) for i, district in enumerate(DISTRICTS))
+AGE_GROUP_INDEX = dict((age_group, i) for i, age_group in enumerate(AGE_GROUPS))
+
+class EventLog:
+    """Writes transitions to a binary file, one chunk at a time"""
+
+    def __init__(self, filename, chunk_size=65536):
+        self.filename = filename
+        self.file = open(filename, "wb")
+        self.chunk = np.zeros(chunk_size, dtype=EVENT_DTYPE)
+        self.count = 0
+
+    def record(self, step, agent, source, old_state, new_state, outcome=None):
+        """
+        Records the transition of an agent, exposed by source (or None). The
+        outcome (see enum.outcome) tells deaths and recoveries apart.
+        """
+        self.chunk[self.count] = (
+            step,
+            agent.unique_id,
+            "" if source is None else source.unique_id,
+            DISTRICT_INDEX[agent.district],
+            AGE_GROUP_INDEX[agent.age_group],
+            agent.shape.x,
+            agent.shape.y,
+            old_state,
+            new_state,
+            "" if outcome is None else outcome)
+        self.count += 1
+
+        if self.count == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        """Appends the recorded transitions to the file"""
+        self.file.write(self.chunk[:self.count].tobytes())
+        self.file.flush()
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def read_event_log(filename):
+    """Returns the transitions of a log as a memory-mapped record array"""
+    try:
+        return np.memmap(filename, dtype=EVENT_DTYPE, mode="r")
+    except ValueError:
+        # Empty logs cannot be memory-mapped
+        return np.zeros(0, dtype=EVENT_DTYPE)
+
+def secondary_cases(events):
+    """Returns the sorted ids of the source agents and how many agents each exposed"""
+    exposures = events[(events["new_state"] == b"E") & (events["source_id"] != b"")]
+    return np.unique(exposures["source_id"], return_counts=True)
+
+def reproduction_numbers(events, steps):
+    """
+    Returns the case reproduction number per step and district: the mean
+    number of agents exposed by the agents that were exposed at that step.
+    Agents that were exposed or infected at the start are not counted.
+    """
+    exposures = events[events["new_state"] == b"E"]
+    sources, counts = secondary_cases(events)
+
+    cases = np.zeros(len(exposures))
+    if len(sources) > 0:
+        index = np.minimum(np.searchsorted(sources, exposures["agent_id"]), len(sources) - 1)
+        found = sources[index] == exposures["agent_id"]
+        cases[found] = counts[index[found]]
+
+    total_cases = np.zeros((steps + 1, len(DISTRICTS)))
+    exposed = np.zeros((steps + 1, len(DISTRICTS)))
+    np.add.at(total_cases, (exposures["step"], exposures["district"]), cases)
+    np.add.at(exposed, (exposures["step"], exposures["district"]), 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total_cases / exposed
@@ -7,6 +7,7 @@ from covid_19_model.enum.immunity import Immunity
 from covid_19_model.enum.state import State
 from covid_19_model.agents import PersonAgent
 from covid_19_model.space import QuezonCity
+from covid_19_model.population import DISTRICTS, AGE_GROUPS, load_population
 from covid_19_model.data_collectors import *
 from covid_19_model.utils import coin_toss
 from shapely.geometry import Point
@@ -17,9 +18,28 @@ import random
 class Covid19Model(Model):
     """Covid19 Agent-Based Model for Quezon City, Philippines"""
 
-    def __init__(self, variable_params, fixed_params):
-        """Initializes the model"""
+    # Changes whenever the model's behavior changes (see cache.py)
+    VERSION = "1.0"
+
+    @classmethod
+    def cache_options(cls):
+        """Returns the class options that change the model's results (see cache.py)"""
+        return {}
+
+    def __init__(self, variable_params, fixed_params, seed=None, event_log=None, population=None):
+        """
+        Initializes the model. If an EventLog is given, every state transition
+        of the agents is recorded to it. If a population (or the filename of a
+        population) built by population.py is given, its agents are loaded
+        instead of being generated.
+        """
+        # Mesa seeds self.random from the seed keyword; agents are also
+        # generated through the random module, so it is seeded as well.
+        if seed is not None:
+            random.seed(seed)
+
         self.SEIR = self.initialize_SEIR_dictionary(variable_params)
+        self.event_log = event_log
 
         # Virus-Host Parameters
         self.transmission_rate = self.to_district_agegroup_matrix(fixed_params["transmission_rate"])
@@ -53,19 +73,24 @@ class Covid19Model(Model):
         self.grid = QuezonCity(self)
 
         # Instantiates PersonAgents
-        for compartment, state in (
-            ("susceptible", State.SUSCEPTIBLE),
-            ("exposed", State.EXPOSED),
-            ("infected", State.INFECTED)
-        ):
-            self.instantiate_person_agents(
-                variable_params[compartment],
-                state,
-                self.schedule,
-                self.grid,
-                self.wearing_mask_percentage,
-                self.physical_distancing_percentage,
-                self.mobile_worker_percentage)
+        if population is not None:
+            if isinstance(population, str):
+                population = load_population(population)
+            self.instantiate_population(population, self.schedule, self.grid)
+        else:
+            for compartment, state in (
+                ("susceptible", State.SUSCEPTIBLE),
+                ("exposed", State.EXPOSED),
+                ("infected", State.INFECTED)
+            ):
+                self.instantiate_person_agents(
+                    variable_params[compartment],
+                    state,
+                    self.schedule,
+                    self.grid,
+                    self.wearing_mask_percentage,
+                    self.physical_distancing_percentage,
+                    self.mobile_worker_percentage)
 
         # Instantiates data collectors
         self.data_collector_1 = self.instantiate_data_collector("district1")
@@ -205,6 +230,36 @@ class Covid19Model(Model):
                     grid.add_agents(agent)
                     schedule.add(agent)
 
+    def instantiate_population(self, population, schedule, grid):
+        """Instantiates PersonAgents from a population built by population.py"""
+        agents = []
+        for (unique_id, district, age_group, age, state, wearing_mask,
+            physical_distancing, mobile_worker, household, x, y) in population.tolist():
+            agents.append(PersonAgent(
+                unique_id = unique_id.decode(),
+                model = self,
+                shape = Point(x, y),
+                district = DISTRICTS[district],
+                state = state.decode(),
+                age = age,
+                age_group = AGE_GROUPS[age_group],
+                wearing_mask = wearing_mask,
+                physical_distancing = physical_distancing,
+                mobile_worker = mobile_worker,
+                household = household))
+
+        # Adds agents to grid (in bulk) and scheduler
+        grid.add_agents(agents)
+        for agent in agents:
+            schedule.add(agent)
+
+        # The initial S, E and I counts are those of the population
+        for state in (State.SUSCEPTIBLE, State.EXPOSED, State.INFECTED):
+            counts = np.zeros((len(AGE_GROUPS), len(DISTRICTS)), dtype=int)
+            selected = population["state"] == state.encode()
+            np.add.at(counts, (population["age_group"][selected], population["district"][selected]), 1)
+            self.SEIR[state].loc[:, :] = counts
+
     def step(self):
         """Advances the model by one step"""
         # print(self.SEIR)
@@ -0,0 +1,332 @@
+# partition.py
+
+"""
+Spatial domain decomposition of the Quezon City model.
+
+The six districts are split among worker processes. Each worker runs a
+Covid19Model that owns the agents currently located inside its districts.
+At every step the workers hand over migrating agents (agents that moved
+into a district owned by another worker) and halo agents (infected agents
+within agent_exposure_distance of another worker's districts), and report
+their SEIR counts so that the coordinator can collect the global values.
+"""
+
+from covid_19_model.model import Covid19Model
+from covid_19_model.agents import PersonAgent
+from covid_19_model.enum.state import State
+from covid_19_model.population import load_population
+from shapely.geometry import Point
+from shapely.prepared import prep
+import multiprocessing
+import numpy as np
+
+DISTRICTS = ["district%i" % (i+1) for i in range(6)]
+
+def partition_districts(processes):
+    """Splits the six districts among the given number of workers"""
+    processes = max(1, min(processes, len(DISTRICTS)))
+    return [DISTRICTS[i::processes] for i in range(processes)]
+
+def mask_districts(variable_params, districts):
+    """Returns the initial population with the other districts set to zero"""
+    mask = np.array([district in districts for district in DISTRICTS])
+    return dict(
+        (compartment, (np.array(population) * mask).tolist())
+        for compartment, population in variable_params.items())
+
+def agent_to_record(agent):
+    """Packs a PersonAgent into a picklable tuple"""
+    return (
+        agent.unique_id,
+        agent.shape.x,
+        agent.shape.y,
+        agent.district,
+        agent.state,
+        agent.age,
+        agent.age_group,
+        agent.wearing_mask,
+        agent.physical_distancing,
+        agent.mobile_worker,
+        agent.household,
+        agent.days_infected,
+        agent.days_incubating)
+
+def record_to_agent(record, model):
+    """Instantiates a PersonAgent of the given model from a packed record"""
+    (unique_id, x, y, district, state, age, age_group, wearing_mask,
+        physical_distancing, mobile_worker, household, days_infected, days_incubating) = record
+
+    agent = PersonAgent(
+        unique_id = unique_id,
+        model = model,
+        shape = Point(x, y),
+        district = district,
+        state = state,
+        age = age,
+        age_group = age_group,
+        wearing_mask = wearing_mask,
+        physical_distancing = physical_distancing,
+        mobile_worker = mobile_worker,
+        household = household)
+    agent.days_infected = days_infected
+    agent.days_incubating = days_incubating
+    return agent
+
+class DistrictWorker:
+    """Runs the part of the model owned by one worker process"""
+
+    def __init__(self, index, owners, variable_params, fixed_params, seed=None, population=None):
+        self.index = index
+        self.owners = owners
+        self.districts = [district for district, owner in owners.items() if owner == index]
+
+        # Keeps the agents of the owned districts from the population file
+        if population is not None:
+            population = load_population(population)
+            owned = [DISTRICTS.index(district) for district in self.districts]
+            population = population[np.isin(population["district"], owned)]
+
+        self.model = Covid19Model(
+            mask_districts(variable_params, self.districts),
+            fixed_params,
+            seed = seed,
+            population = population)
+
+        # Prepared district shapes, owned districts first since most agents stay
+        districts = sorted(
+            self.model.grid.districts.items(),
+            key = lambda item: owners[item[0]] != index)
+        self.shapes = [(owners[name], prep(district.shape)) for name, district in districts]
+
+        # District shapes grown by the exposure distance, used to find halo agents
+        distance = self.model.agent_exposure_distance
+        self.halo_shapes = [
+            (owners[name], prep(district.shape.buffer(distance)))
+            for name, district in districts]
+
+    def locate(self, point):
+        """Returns the worker owning the given position, or None if outside the city"""
+        for owner, shape in self.shapes:
+            if shape.contains(point):
+                return owner
+        return None
+
+    def step(self, migrants, halo):
+        """Advances the owned agents by one step"""
+        model = self.model
+        model.steps += 1
+
+        for record in migrants:
+            agent = record_to_agent(record, model)
+            model.grid.add_agents(agent)
+            model.schedule.add(agent)
+            model.add_one(agent.district, agent.age_group, agent.state)
+
+        # Halo agents are not added to the space nor to the scheduler; they
+        # only expose the owned agents around them.
+        for record in halo:
+            record_to_agent(record, model).interact()
+
+        model.schedule.step()
+        model.grid._recreate_rtree()
+
+        return self.exchange()
+
+    def exchange(self):
+        """Returns the emigrating agents, the halo agents and the SEIR report"""
+        model = self.model
+        emigrants = {}
+        halo = {}
+
+        for agent in model.schedule.agents:
+            owner = self.locate(agent.shape)
+            if owner is None:
+                owner = self.index
+
+            if owner != self.index:
+                emigrants.setdefault(owner, []).append(agent_to_record(agent))
+                model.grid.remove_agent(agent)
+                model.schedule.remove(agent)
+                model.remove_one(agent.district, agent.age_group, agent.state)
+
+            if agent.state == State.INFECTED:
+                neighbors = set(
+                    worker for worker, shape in self.halo_shapes
+                    if worker != owner and shape.contains(agent.shape))
+                for worker in neighbors:
+                    halo.setdefault(worker, []).append(agent_to_record(agent))
+
+        return emigrants, halo, self.report()
+
+    def report(self):
+        """Returns the worker's SEIR counts and summaries"""
+        model = self.model
+        return {
+            "SEIR": dict((compartment, model.SEIR[compartment].values.copy()) for compartment in "SEIR"),
+            "total_summary": model.total_summary.values.copy(),
+            "dead": model.dead.values.copy(),
+            "recovered": model.recovered.values.copy(),
+        }
+
+def run_worker(connection, index, owners, variable_params, fixed_params, seed, population):
+    """Worker process: steps its districts whenever the coordinator asks to"""
+    worker = DistrictWorker(index, owners, variable_params, fixed_params, seed, population)
+    connection.send(worker.exchange())
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        migrants, halo = message
+        connection.send(worker.step(migrants, halo))
+
+    connection.close()
+
+class PartitionedCovid19Model(Covid19Model):
+    """
+    Covid19Model partitioned by district across worker processes.
+
+    The coordinator holds no agents; it routes migrating and halo agents
+    between the workers and aggregates their counts, so it exposes the same
+    data collectors and summaries as Covid19Model (e.g. for batchrun).
+
+    Difference with Covid19Model: halo agents are copies of the infected
+    agents near a district border at the end of the previous step. They
+    expose agents across the border before their owner runs their status()
+    for the current step, so an agent that dies or recovers at step t can
+    still expose agents of other workers at step t. Cross-district
+    transmission is therefore slightly higher than in a serial run.
+    """
+
+    # Default number of worker processes; None uses one per CPU
+    PROCESSES = None
+
+    @classmethod
+    def cache_options(cls):
+        # The district split and the workers' seeds depend on the partitions
+        processes = cls.PROCESSES or multiprocessing.cpu_count()
+        return {"partitions": len(partition_districts(processes))}
+
+    def __init__(self, variable_params, fixed_params, seed=None, processes=None, population=None):
+        """
+        Initializes the model and starts the worker processes. The population,
+        if given, is the filename of a population built by population.py.
+        """
+        self.SEIR = self.initialize_SEIR_dictionary(variable_params)
+        self.agent_exposure_distance = fixed_params["agent_exposure_distance"]
+
+        # Starts one worker per partition
+        if processes is None:
+            processes = self.PROCESSES or multiprocessing.cpu_count()
+        partitions = partition_districts(processes)
+        owners = dict(
+            (district, index)
+            for index, districts in enumerate(partitions)
+            for district in districts)
+
+        self.workers = []
+        self.connections = []
+        for index in range(len(partitions)):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target = run_worker,
+                args = (
+                    worker_connection,
+                    index,
+                    owners,
+                    variable_params,
+                    fixed_params,
+                    None if seed is None else seed + index,
+                    population),
+                daemon = True)
+            worker.start()
+            worker_connection.close()
+            self.workers.append(worker)
+            self.connections.append(connection)
+
+        # Instantiates data collectors
+        self.data_collector_1 = self.instantiate_data_collector("district1")
+        self.data_collector_2 = self.instantiate_data_collector("district2")
+        self.data_collector_3 = self.instantiate_data_collector("district3")
+        self.data_collector_4 = self.instantiate_data_collector("district4")
+        self.data_collector_5 = self.instantiate_data_collector("district5")
+        self.data_collector_6 = self.instantiate_data_collector("district6")
+
+        # Sets summary-related variables
+        self.total_summary = self.initialize_total_summary()
+        self.dead = self.district_agegroup_matrix()
+        self.recovered = self.district_agegroup_matrix()
+        self.steps = 0
+
+        # Receives the initial counts and halo agents
+        self.inbox = self.gather()
+        self.max_summary = self.initialize_max_summary()
+
+        # Sets the running state of model to True
+        self.running = True
+
+    def gather(self):
+        """Aggregates the workers' reports and returns the agents to route"""
+        inbox = [([], []) for connection in self.connections]
+        reports = []
+
+        for connection in self.connections:
+            emigrants, halo, report = connection.recv()
+            for worker, records in emigrants.items():
+                inbox[worker][0].extend(records)
+            for worker, records in halo.items():
+                inbox[worker][1].extend(records)
+            reports.append(report)
+
+        for compartment in "SEIR":
+            self.SEIR[compartment].loc[:, :] = sum(report["SEIR"][compartment] for report in reports)
+        self.total_summary.loc[:, :] = sum(report["total_summary"] for report in reports)
+        self.dead.loc[:, :] = sum(report["dead"] for report in reports)
+        self.recovered.loc[:, :] = sum(report["recovered"] for report in reports)
+
+        # Migrants are counted by neither worker until the receiver adds them
+        for migrants, _ in inbox:
+            for record in migrants:
+                district, state, age_group = record[3], record[4], record[6]
+                self.add_one(district, age_group, state)
+
+        return inbox
+
+    def step(self):
+        """Advances the model by one step"""
+        self.steps += 1
+        self.data_collector_1.collect(self)
+        self.data_collector_2.collect(self)
+        self.data_collector_3.collect(self)
+        self.data_collector_4.collect(self)
+        self.data_collector_5.collect(self)
+        self.data_collector_6.collect(self)
+
+        for connection, message in zip(self.connections, self.inbox):
+            connection.send(message)
+        self.inbox = self.gather()
+
+        for district in DISTRICTS:
+            self.update_summary(district, "max_exposed", State.EXPOSED)
+            self.update_summary(district, "max_infected", State.INFECTED)
+
+    def close(self):
+        """Stops the worker processes"""
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                # The worker has died
+                pass
+            connection.close()
+        for worker in self.workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.connections = []
+        self.workers = []
+
+    def __del__(self):
+        if getattr(self, "workers", None):
+            self.close()
@@ -0,0 +1,156 @@
+# population.py
+
+"""
+Synthetic population builder.
+
+Builds the agents of the initial population in bulk from the age group by
+district matrices of the variable parameters, in the same way as
+Covid19Model.instantiate_person_agents() but with NumPy, and groups them
+into households that share a position. Each household is headed by an adult
+(20 to 69 years old); the other agents, of any age, join households at
+random, so household composition follows the district's age structure but
+is not fitted to census household data. Populations are saved as .npy files
+(see POPULATION_DTYPE) that Covid19Model can load directly.
+"""
+
+from covid_19_model.enum.state import State
+from covid_19_model.space import QuezonCity
+from shapely.geometry import Point, box
+from shapely.prepared import prep
+import numpy as np
+
+POPULATION_DTYPE = np.dtype([
+    ("unique_id", "S24"),
+    ("district", "u1"),  # 0 to 5 for district1 to district6
+    ("age_group", "u1"), # 0 to 8 for 0 to 9, ..., 80+
+    ("age", "u1"),
+    ("state", "S1"),
+    ("wearing_mask", "?"),
+    ("physical_distancing", "?"),
+    ("mobile_worker", "?"),
+    ("household", "<i8"),
+    ("x", "<f8"),
+    ("y", "<f8"),
+])
+
+DISTRICTS = ["district%i" % (i+1) for i in range(6)]
+AGE_GROUPS = ["%i to %i" % (i * 10, i * 10 + 9) for i in range(8)] + ["80+"]
+# Age groups of household heads: 20 to 29, ..., 60 to 69
+HEAD_AGE_GROUPS = np.arange(2, 7)
+COMPARTMENTS = (
+    ("susceptible", State.SUSCEPTIBLE),
+    ("exposed", State.EXPOSED),
+    ("infected", State.INFECTED),
+)
+
+def random_positions(polygon, size, rng, cells_per_axis=64):
+    """
+    Picks uniformly random positions inside a polygon. The polygon's bounds
+    are divided into square cells, cells_per_axis along the longer side;
+    points are drawn in the cells touching the polygon, and only the points
+    of cells crossing its boundary are tested (and drawn again if outside).
+    """
+    prepared = prep(polygon)
+    x_min, y_min, x_max, y_max = polygon.bounds
+    resolution = max(x_max - x_min, y_max - y_min) / cells_per_axis
+
+    cells = []
+    inner = []
+    for x in np.arange(x_min, x_max, resolution):
+        for y in np.arange(y_min, y_max, resolution):
+            cell = box(x, y, x + resolution, y + resolution)
+            if prepared.intersects(cell):
+                cells.append((x, y))
+                inner.append(prepared.contains(cell))
+    cells = np.array(cells)
+    inner = np.array(inner)
+
+    positions = np.empty((0, 2))
+    while len(positions) < size:
+        missing = size - len(positions)
+        index = rng.integers(len(cells), size=missing)
+        points = cells[index] + rng.random((missing, 2)) * resolution
+
+        inside = inner[index]
+        for i in np.flatnonzero(~inside):
+            inside[i] = prepared.contains(Point(points[i]))
+        positions = np.concatenate([positions, points[inside]])
+
+    return positions
+
+def assign_households(age_groups, mean_household_size, rng):
+    """
+    Returns the household (0 to n - 1) of each agent. Heads are drawn from
+    the adults (or from everyone if there are none) and every other agent
+    joins one of their households at random.
+    """
+    size = len(age_groups)
+    adults = np.flatnonzero(np.isin(age_groups, HEAD_AGE_GROUPS))
+    candidates = adults if len(adults) > 0 else np.arange(size)
+    heads = rng.choice(
+        candidates,
+        size = min(len(candidates), max(1, int(round(size / mean_household_size)))),
+        replace = False)
+
+    household = rng.integers(len(heads), size=size)
+    household[heads] = np.arange(len(heads))
+    return household
+
+def build_population(variable_params, fixed_params, seed=None, mean_household_size=4.0):
+    """Returns the initial population as an array of POPULATION_DTYPE"""
+    rng = np.random.default_rng(seed)
+    districts = QuezonCity(None).districts
+
+    # One row per (compartment, age group, district) with its number of agents
+    groups = [
+        (state, i, j, int(count))
+        for compartment, state in COMPARTMENTS
+        for i, row in enumerate(variable_params[compartment])
+        for j, count in enumerate(row)
+        if int(count) > 0]
+
+    size = sum(count for _, _, _, count in groups)
+    population = np.zeros(size, dtype=POPULATION_DTYPE)
+    counts = np.array([count for _, _, _, count in groups], dtype=int)
+    population["state"] = np.repeat([state for state, _, _, _ in groups], counts)
+    population["age_group"] = np.repeat([i for _, i, _, _ in groups], counts)
+    population["district"] = np.repeat([j for _, _, j, _ in groups], counts)
+
+    # Same identifiers as Covid19Model.instantiate_person_agents()
+    index = np.arange(size) - np.repeat(np.cumsum(counts) - counts, counts)
+    population["unique_id"] = [
+        "%i%i%i%s" % (i, j, k, state.decode())
+        for i, j, k, state in zip(population["age_group"], population["district"], index, population["state"])]
+
+    population["age"] = population["age_group"] * 10 + rng.integers(10, size=size)
+    population["wearing_mask"] = rng.random(size) < fixed_params["wearing_mask_percentage"]
+    population["physical_distancing"] = rng.random(size) < fixed_params["physical_distancing_percentage"]
+    population["mobile_worker"] = (
+        (population["age"] >= 18)
+        & (population["age"] <= 60)
+        & (rng.random(size) < fixed_params["mobile_worker_percentage"]))
+
+    # Groups each district's agents into households at random positions
+    households = 0
+    for j, district in enumerate(DISTRICTS):
+        members = np.flatnonzero(population["district"] == j)
+        if len(members) == 0:
+            continue
+
+        household = assign_households(population["age_group"][members], mean_household_size, rng)
+        count = household.max() + 1
+        positions = random_positions(districts[district].shape, count, rng)
+
+        population["household"][members] = households + household
+        population["x"][members] = positions[household, 0]
+        population["y"][members] = positions[household, 1]
+        households += count
+
+    return population
+
+def save_population(filename, population):
+    np.save(filename, population)
+
+def load_population(filename):
+    """Loads a population saved by save_population(), memory-mapped"""
+    return np.load(filename, mmap_mode="r")
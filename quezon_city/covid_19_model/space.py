@@ -2,8 +2,11 @@
 
 from mesa_geo import GeoSpace, GeoAgent, AgentCreator
 from shapely.geometry import Point
+import os
 import random
 
+RES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "res")
+
 class DistrictAgent(GeoAgent):
     """District GeoAgent"""
     def __init__(self, unique_id, model, shape):
@@ -17,8 +20,8 @@ class QuezonCity(GeoSpace):
     """Quezon City GeoSpace"""
 
     MAP_COORDS = [14.676208, 121.043861] # Quezon City
-    quezon_city_districts_geojson = "covid_19_model/res/quezon_city_districts.geojson"
-    quezon_city_geojson = "covid_19_model/res/quezon_city.geojson"
+    quezon_city_districts_geojson = os.path.join(RES_DIR, "quezon_city_districts.geojson")
+    quezon_city_geojson = os.path.join(RES_DIR, "quezon_city.geojson")
 
     def __init__(self, model):
         super().__init__()
@@ -0,0 +1,126 @@
+# statistics.py
+
+"""
+Streaming statistics of an ensemble of runs.
+
+Each run updates the statistics as soon as it finishes, so the memory used
+does not grow with the number of runs. Means and variances are computed with
+Welford's algorithm. Quantiles are approximated from a reservoir sample of a
+fixed number of runs.
+"""
+
+import numpy as np
+import pickle
+
+DISTRICTS = ["district%i" % (i+1) for i in range(6)]
+COMPARTMENTS = list("SEIR")
+
+class RunningStatistics:
+    """Running mean, variance, minimum, maximum and quantiles of arrays"""
+
+    def __init__(self, reservoir_size=100, seed=None):
+        self.reservoir_size = reservoir_size
+        self.random = np.random.default_rng(seed)
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+        self.min = None
+        self.max = None
+        self.reservoir = None
+
+    def update(self, values):
+        """Adds one sample (an array of the same shape for every sample)"""
+        values = np.asarray(values, dtype=float)
+
+        if self.count == 0:
+            self.mean = np.zeros(values.shape)
+            self.m2 = np.zeros(values.shape)
+            self.min = values.copy()
+            self.max = values.copy()
+            self.reservoir = np.empty((self.reservoir_size,) + values.shape)
+
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+        np.minimum(self.min, values, out=self.min)
+        np.maximum(self.max, values, out=self.max)
+
+        # Reservoir sampling: every sample is kept with equal probability
+        if self.count <= self.reservoir_size:
+            self.reservoir[self.count - 1] = values
+        else:
+            index = self.random.integers(self.count)
+            if index < self.reservoir_size:
+                self.reservoir[index] = values
+
+    def variance(self):
+        """Returns the sample variance"""
+        if self.count < 2:
+            return np.full(self.mean.shape, np.nan)
+        return self.m2 / (self.count - 1)
+
+    def quantiles(self, q):
+        """Returns the approximate quantiles q, stacked along the first axis"""
+        return np.quantile(self.reservoir[:min(self.count, self.reservoir_size)], q, axis=0)
+
+    def summary(self, q):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.variance(),
+            "min": self.min,
+            "max": self.max,
+            "quantiles": self.quantiles(q),
+        }
+
+class EnsembleStatistics:
+    """
+    Statistics of the output data of an ensemble of runs:
+        districts: S, E, I, R per step and district, as (step, compartment, district)
+        age_groups: S, E, I, R per step, age group and district, as
+            (step, compartment, age group, district) like batch.run_model()'s
+            age_group_SEIR
+        max_summary: peak sizes and times per district
+        total_summary: total exposed, infected, dead and recovered per district
+        dead, recovered: per age group and district
+    """
+
+    QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+    def __init__(self, reservoir_size=100, seed=None):
+        self.statistics = dict(
+            (name, RunningStatistics(reservoir_size, seed))
+            for name in ("districts", "age_groups", "max_summary", "total_summary", "dead", "recovered"))
+
+    def update(self, output_data):
+        """Adds the output data of one run (see batch.run_model)"""
+        districts = np.stack([
+            output_data[district][COMPARTMENTS].values
+            for district in DISTRICTS], axis=2)
+
+        self.statistics["districts"].update(districts)
+        # Runs saved before age group curves were recorded have none
+        if "age_group_SEIR" in output_data:
+            self.statistics["age_groups"].update(output_data["age_group_SEIR"])
+        for name in ("max_summary", "total_summary", "dead", "recovered"):
+            self.statistics[name].update(output_data[name].values)
+
+    def save(self, filename):
+        """Saves the statistics (of the outputs found in any run) as a NumPy .npz archive"""
+        arrays = {"quantiles": np.array(self.QUANTILES)}
+        for name, statistics in self.statistics.items():
+            if statistics.count == 0:
+                continue
+            for key, value in statistics.summary(self.QUANTILES).items():
+                arrays["%s_%s" % (name, key)] = value
+        np.savez_compressed(filename, **arrays)
+
+def summarize(filenames, summary_filename, reservoir_size=100):
+    """Computes the statistics of saved runs, loading one run at a time"""
+    statistics = EnsembleStatistics(reservoir_size)
+    for filename in filenames:
+        with open(filename, "rb") as output_file:
+            statistics.update(pickle.load(output_file))
+    statistics.save(summary_filename)
+    return statistics
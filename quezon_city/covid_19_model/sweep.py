@@ -0,0 +1,273 @@
+# sweep.py
+
+"""
+Parameter sweeps distributed through a job queue.
+
+A coordinator publishes one job per (parameter set, seed) to a queue. Workers,
+on any node that can reach the queue and the output directory, acquire jobs,
+run the model and mark the jobs as done. A job is leased to one worker at a
+time and the lease is renewed while the job runs: if the worker is lost, the
+lease expires and another worker retries the job. Completion is idempotent,
+so a job finished twice is only counted once.
+
+Queue backends implement the JobQueue interface. SQLiteJobQueue needs no
+running service and works on one machine or on a shared filesystem that
+supports SQLite's file locking.
+"""
+
+from covid_19_model.batch import run_model, save_output, output_filename
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Seconds between checks for expired leases by workers with nothing to run
+RETRY_INTERVAL = 10
+
+class JobQueue:
+    """Interface of the job queues used by sweeps"""
+
+    def publish(self, job_id, payload):
+        """Adds a job to the queue. Publishing an existing job does nothing."""
+        raise NotImplementedError
+
+    def acquire(self, worker_id, lease_time):
+        """Leases a job to a worker. Returns (job_id, payload, token) or None."""
+        raise NotImplementedError
+
+    def renew(self, job_id, token, lease_time):
+        """Extends a job's lease. Returns False if the lease was lost."""
+        raise NotImplementedError
+
+    def complete(self, job_id, token, result):
+        """Marks a job as done. Returns False if it was already done."""
+        raise NotImplementedError
+
+    def fail(self, job_id, token, error):
+        """Returns a job to the queue, or marks it as failed if out of attempts"""
+        raise NotImplementedError
+
+    def counts(self):
+        """
+        Returns the number of jobs for each status. Running jobs whose lease
+        expired are counted as pending, or as failed if out of attempts.
+        """
+        raise NotImplementedError
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in an SQLite database file"""
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        # The connection is shared with the workers' heartbeat threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path,
+            timeout = 60,
+            isolation_level = None,
+            check_same_thread = False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                token TEXT,
+                worker_id TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT
+            )""")
+
+    def publish(self, job_id, payload):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, payload, status, max_attempts) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(payload), PENDING, self.max_attempts))
+
+    def acquire(self, worker_id, lease_time):
+        now = time.time()
+        token = uuid.uuid4().hex
+
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose lease expired after their last attempt are given up
+                cursor.execute(
+                    "UPDATE jobs SET status = ?, error = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                    (FAILED, "Lease expired", RUNNING, now))
+
+                row = cursor.execute(
+                    "SELECT job_id, payload FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY rowid LIMIT 1",
+                    (PENDING, RUNNING, now)).fetchone()
+
+                if row is not None:
+                    cursor.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, token = ?, "
+                        "worker_id = ?, lease_expires = ? WHERE job_id = ?",
+                        (RUNNING, token, worker_id, now + lease_time, row[0]))
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), token
+
+    def renew(self, job_id, token, lease_time):
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND token = ? AND status = ?",
+                (time.time() + lease_time, job_id, token, RUNNING))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, token, result):
+        # Runs are deterministic given their seed, so the first completion
+        # wins even if the job was meanwhile leased to another worker.
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_expires = NULL "
+                "WHERE job_id = ? AND status != ?",
+                (DONE, json.dumps(result), job_id, DONE))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, token, error):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, "
+                "error = ?, lease_expires = NULL WHERE job_id = ? AND token = ? AND status = ?",
+                (PENDING, FAILED, error, job_id, token, RUNNING))
+
+    def counts(self):
+        counts = dict((status, 0) for status in (PENDING, RUNNING, DONE, FAILED))
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT CASE WHEN status = ? AND lease_expires < ? THEN "
+                "CASE WHEN attempts < max_attempts THEN ? ELSE ? END "
+                "ELSE status END AS current_status, COUNT(*) "
+                "FROM jobs GROUP BY current_status",
+                (RUNNING, time.time(), PENDING, FAILED)).fetchall()
+        counts.update(rows)
+        return counts
+
+    def close(self):
+        self.connection.close()
+
+def job_id(payload):
+    """Returns an identifier derived from the job's contents"""
+    content = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(content).hexdigest()
+
+def publish_sweep(queue, experiments, runs, max_iterations, seed=0):
+    """
+    Publishes one job per run of each experiment. Experiments are model_params
+    dictionaries (fixed_params and variable_params), numbered in order.
+    """
+    job_ids = []
+    for experiment_id, model_params in enumerate(experiments):
+        for run in range(runs):
+            payload = {
+                "experiment_id": experiment_id,
+                "run": run,
+                "seed": seed + run,
+                "max_iterations": max_iterations,
+                "fixed_params": model_params["fixed_params"],
+                "variable_params": model_params["variable_params"],
+            }
+            job_ids.append(job_id(payload))
+            queue.publish(job_ids[-1], payload)
+    return job_ids
+
+def wait_for_sweep(queue, poll_interval=10):
+    """
+    Blocks until no job is pending or running; returns the final counts.
+    Jobs whose lease expired count as pending until a worker retries them.
+    """
+    while True:
+        counts = queue.counts()
+        if counts[PENDING] == 0 and counts[RUNNING] == 0:
+            return counts
+        time.sleep(poll_interval)
+
+def heartbeat(queue, job_id, token, lease_time, stop):
+    """Renews a job's lease until stop is set or the lease is lost"""
+    while not stop.wait(lease_time / 3):
+        if not queue.renew(job_id, token, lease_time):
+            break
+
+def work(
+    queue,
+    model,
+    output_dir="output",
+    worker_id=None,
+    lease_time=3600,
+    poll_interval=None,
+    cache=None,
+):
+    """
+    Runs jobs from the queue until no job is pending or running. While other
+    workers run jobs, the worker waits to retry them if their lease expires.
+    If poll_interval is given, the worker waits for new jobs instead of
+    stopping. Returns the number of jobs run.
+    """
+    if worker_id is None:
+        worker_id = "%s:%i" % (socket.gethostname(), os.getpid())
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs_run = 0
+    while True:
+        job = queue.acquire(worker_id, lease_time)
+        if job is None:
+            counts = queue.counts()
+            if counts[PENDING] > 0:
+                continue
+            if counts[RUNNING] == 0 and poll_interval is None:
+                return jobs_run
+            time.sleep(poll_interval or RETRY_INTERVAL)
+            continue
+
+        # Renews the lease while the job runs
+        job_id, payload, token = job
+        stop = threading.Event()
+        renewal = threading.Thread(
+            target = heartbeat,
+            args = (queue, job_id, token, lease_time, stop),
+            daemon = True)
+        renewal.start()
+
+        try:
+            output_data = run_model(
+                model,
+                payload,
+                payload["max_iterations"],
+                seed = payload["seed"],
+                show_progress = False,
+                cache = cache)
+            filename = output_filename(output_dir, payload["experiment_id"], payload["run"])
+            save_output(output_data, filename)
+        except Exception:
+            queue.fail(job_id, token, traceback.format_exc())
+            continue
+        finally:
+            stop.set()
+            renewal.join()
+
+        queue.complete(job_id, token, {"output": filename, "worker_id": worker_id})
+        jobs_run += 1
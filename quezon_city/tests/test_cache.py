@@ -0,0 +1,24 @@
+from covid_19_model.cache import ResultCache, cache_key
+
+MODEL_PARAMS = {"fixed_params": {"rate": 1}, "variable_params": {"population": 2}}
+
+class Model:
+    VERSION = "1.0"
+    PROCESSES = 1
+
+    @classmethod
+    def cache_options(cls):
+        return {"partitions": cls.PROCESSES}
+
+class OtherModel(Model):
+    PROCESSES = 2
+
+def test_key_depends_on_model_options():
+    assert cache_key(Model, MODEL_PARAMS, 0, 10) != cache_key(OtherModel, MODEL_PARAMS, 0, 10)
+
+def test_get_returns_none_after_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    key = cache_key(Model, MODEL_PARAMS, 0, 10)
+    cache.put(key, {"steps": 10})
+
+    assert cache.get(key) is None
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from covid_19_model.calibration import Calibration
+
+class Model:
+    """Infects rate people per step in district1"""
+
+    def __init__(self, variable_params, fixed_params, seed=None):
+        self.rate = fixed_params["rate"]
+        self.SEIR = {"I": {"district1": np.zeros(1)}}
+
+    def step(self):
+        self.SEIR["I"]["district1"] += self.rate
+
+OBSERVED = {"district1": list(range(10))}
+
+def calibration(seed=0):
+    return Calibration(
+        Model, {"rate": 1.0}, {}, {"rate": (0.5, 2.0)}, OBSERVED,
+        workers=1, check_every=1, seed=seed)
+
+def test_candidate_seed_depends_on_multipliers():
+    first, second = calibration(), calibration()
+
+    assert first.candidate_seed([1.0]) == second.candidate_seed([1.0])
+    assert first.candidate_seed([1.0]) != first.candidate_seed([1.5])
+    assert first.candidate_seed([1.0]) != calibration(seed=1).candidate_seed([1.0])
+
+def test_calibration_stops_after_max_simulations():
+    with pytest.raises(RuntimeError):
+        calibration().run(population_size=10, generations=3, quantile=0.0, max_simulations=50)
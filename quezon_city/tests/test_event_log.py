@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from covid_19_model.enum.outcome import Outcome
+from covid_19_model.event_log import EventLog, read_event_log
+
+def person(unique_id):
+    return SimpleNamespace(
+        unique_id = unique_id,
+        district = "district1",
+        age_group = "20 to 29",
+        shape = SimpleNamespace(x=0.0, y=0.0))
+
+def test_removals_record_their_outcome(tmp_path):
+    filename = str(tmp_path / "events.bin")
+    log = EventLog(filename, chunk_size=2)
+    log.record(0, person("a"), person("b"), "S", "E")
+    log.record(1, person("a"), None, "I", "R", Outcome.DEAD)
+    log.record(1, person("b"), None, "I", "R", Outcome.RECOVERED)
+    log.close()
+
+    events = read_event_log(filename)
+    assert list(events["outcome"]) == [b"", b"D", b"R"]
+    assert list(events["source_id"]) == [b"b", b"", b""]
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from covid_19_model.model import Covid19Model
+from covid_19_model.partition import PartitionedCovid19Model
+from covid_19_model.utils import parse_json
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+@pytest.fixture
+def params():
+    return (
+        parse_json(os.path.join(ROOT, "variable_parameters.json")),
+        parse_json(os.path.join(ROOT, "fixed_parameters.json")))
+
+def total_agents(model):
+    return sum(model.SEIR[compartment].values.sum() for compartment in "SEIR")
+
+def test_agents_are_counted_while_migrating(params):
+    model = PartitionedCovid19Model(*params, seed=3, processes=3)
+    try:
+        total = total_agents(model)
+        for i in range(10):
+            model.step()
+            assert total_agents(model) == total
+    finally:
+        model.close()
+
+def test_single_partition_matches_serial_model(params):
+    serial = Covid19Model(*params, seed=3)
+    partitioned = PartitionedCovid19Model(*params, seed=3, processes=1)
+    try:
+        for i in range(10):
+            serial.step()
+            partitioned.step()
+
+        for name in ("data_collector_%i" % (i+1) for i in range(6)):
+            expected = getattr(serial, name).get_model_vars_dataframe()
+            actual = getattr(partitioned, name).get_model_vars_dataframe()
+            assert expected.equals(actual)
+        for compartment in "SEIR":
+            assert serial.SEIR[compartment].equals(partitioned.SEIR[compartment])
+        assert serial.total_summary.equals(partitioned.total_summary)
+    finally:
+        partitioned.close()
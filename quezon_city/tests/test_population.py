@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+from shapely.geometry import Point
+
+from covid_19_model.population import (
+    AGE_GROUPS, COMPARTMENTS, DISTRICTS, HEAD_AGE_GROUPS, build_population)
+from covid_19_model.space import QuezonCity
+from covid_19_model.utils import parse_json
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+@pytest.fixture(scope="module")
+def variable_params():
+    return parse_json(os.path.join(ROOT, "variable_parameters.json"))
+
+@pytest.fixture(scope="module")
+def population(variable_params):
+    fixed_params = parse_json(os.path.join(ROOT, "fixed_parameters.json"))
+    return build_population(variable_params, fixed_params, seed=0)
+
+def test_counts_match_variable_parameters(population, variable_params):
+    for compartment, state in COMPARTMENTS:
+        selected = population[population["state"] == state.encode()]
+        counts = np.zeros((len(AGE_GROUPS), len(DISTRICTS)), dtype=int)
+        np.add.at(counts, (selected["age_group"], selected["district"]), 1)
+        assert np.array_equal(counts, np.array(variable_params[compartment]).astype(int))
+
+def test_positions_are_inside_their_district(population):
+    districts = QuezonCity(None).districts
+    for j, district in enumerate(DISTRICTS):
+        shape = districts[district].shape
+        members = population[population["district"] == j]
+        assert all(shape.contains(Point(x, y)) for x, y in zip(members["x"], members["y"]))
+
+def test_households_share_a_position_and_have_an_adult(population):
+    for household in np.unique(population["household"]):
+        members = population[population["household"] == household]
+        assert len(np.unique(members["district"])) == 1
+        assert np.all(members["x"] == members["x"][0])
+        assert np.all(members["y"] == members["y"][0])
+        assert np.isin(members["age_group"], HEAD_AGE_GROUPS).any()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from covid_19_model.statistics import EnsembleStatistics, RunningStatistics
+
+def output_data(steps=5):
+    data = dict(
+        ("district%i" % (i+1), pd.DataFrame(np.ones((steps, 4)), columns=list("SEIR")))
+        for i in range(6))
+    data["max_summary"] = pd.DataFrame(np.ones((4, 6)))
+    data["total_summary"] = pd.DataFrame(np.ones((4, 6)))
+    data["dead"] = pd.DataFrame(np.ones((9, 6)))
+    data["recovered"] = pd.DataFrame(np.ones((9, 6)))
+    return data
+
+def test_running_statistics_match_batch_statistics():
+    samples = np.random.default_rng(0).normal(size=(200, 3, 2))
+    statistics = RunningStatistics(reservoir_size=50, seed=0)
+    for sample in samples:
+        statistics.update(sample)
+
+    assert np.allclose(statistics.mean, samples.mean(axis=0))
+    assert np.allclose(statistics.variance(), samples.var(axis=0, ddof=1))
+    assert np.allclose(statistics.min, samples.min(axis=0))
+    assert np.allclose(statistics.max, samples.max(axis=0))
+
+def test_runs_without_age_group_curves_are_summarized(tmp_path):
+    statistics = EnsembleStatistics()
+    statistics.update(output_data())
+    statistics.update(output_data())
+
+    filename = str(tmp_path / "summary.npz")
+    statistics.save(filename)
+
+    summary = np.load(filename)
+    assert summary["districts_count"] == 2
+    assert summary["districts_mean"].shape == (5, 4, 6)
+    assert "age_groups_mean" not in summary.files
+
+def test_district_and_age_group_curves_share_axes(tmp_path):
+    age_group_SEIR = np.random.default_rng(0).integers(10, size=(5, 4, 9, 6))
+    data = output_data()
+    for i in range(6):
+        data["district%i" % (i+1)] = pd.DataFrame(age_group_SEIR[:, :, :, i].sum(axis=2), columns=list("SEIR"))
+    data["age_group_SEIR"] = age_group_SEIR
+
+    statistics = EnsembleStatistics()
+    statistics.update(data)
+    filename = str(tmp_path / "summary.npz")
+    statistics.save(filename)
+
+    summary = np.load(filename)
+    assert np.allclose(summary["age_groups_mean"].sum(axis=2), summary["districts_mean"])
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+from covid_19_model import sweep
+from covid_19_model.sweep import SQLiteJobQueue, publish_sweep, wait_for_sweep, work
+
+EXPERIMENTS = [{"fixed_params": {"rate": 1}, "variable_params": {"population": 2}}]
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "sweep.db"), max_attempts=2)
+    yield queue
+    queue.close()
+
+def test_publish_is_idempotent(queue):
+    first = publish_sweep(queue, EXPERIMENTS, runs=3, max_iterations=5)
+    second = publish_sweep(queue, EXPERIMENTS, runs=3, max_iterations=5)
+
+    assert first == second
+    assert queue.counts()[sweep.PENDING] == 3
+
+def test_expired_lease_is_acquired_again(queue):
+    publish_sweep(queue, EXPERIMENTS, runs=1, max_iterations=5)
+    job_id, _, token = queue.acquire("lost", lease_time=0.01)
+    time.sleep(0.05)
+
+    job = queue.acquire("worker", lease_time=100)
+    assert job is not None
+    assert job[0] == job_id
+    assert job[2] != token
+
+def test_renewed_lease_is_not_acquired(queue):
+    publish_sweep(queue, EXPERIMENTS, runs=1, max_iterations=5)
+    job_id, _, token = queue.acquire("worker", lease_time=0.05)
+
+    assert queue.renew(job_id, token, lease_time=100)
+    time.sleep(0.1)
+    assert queue.acquire("other", lease_time=100) is None
+    assert queue.counts()[sweep.RUNNING] == 1
+
+def test_job_fails_when_out_of_attempts(queue):
+    publish_sweep(queue, EXPERIMENTS, runs=1, max_iterations=5)
+
+    job_id, _, token = queue.acquire("worker", lease_time=100)
+    queue.fail(job_id, token, "error")
+    assert queue.counts()[sweep.PENDING] == 1
+
+    job_id, _, token = queue.acquire("worker", lease_time=100)
+    queue.fail(job_id, token, "error")
+    assert queue.counts()[sweep.FAILED] == 1
+    assert queue.acquire("worker", lease_time=100) is None
+
+def test_expired_lease_fails_when_out_of_attempts(queue):
+    publish_sweep(queue, EXPERIMENTS, runs=1, max_iterations=5)
+    for i in range(2):
+        queue.acquire("lost", lease_time=0.01)
+        time.sleep(0.05)
+
+    assert queue.counts()[sweep.FAILED] == 1
+    assert queue.acquire("worker", lease_time=100) is None
+
+def test_complete_twice_returns_false(queue):
+    publish_sweep(queue, EXPERIMENTS, runs=1, max_iterations=5)
+    job_id, _, token = queue.acquire("worker", lease_time=100)
+
+    assert queue.complete(job_id, token, {})
+    assert not queue.complete(job_id, token, {})
+    assert queue.counts()[sweep.DONE] == 1
+
+def test_worker_retries_job_of_lost_worker(queue, tmp_path, monkeypatch):
+    monkeypatch.setattr(sweep, "RETRY_INTERVAL", 0.05)
+    monkeypatch.setattr(sweep, "run_model", lambda model, payload, *args, **kwargs: payload)
+    monkeypatch.setattr(sweep, "save_output", lambda output_data, filename: None)
+
+    publish_sweep(queue, EXPERIMENTS, runs=1, max_iterations=5)
+    queue.acquire("lost", lease_time=0.2)
+
+    assert work(queue, None, output_dir=str(tmp_path)) == 1
+    assert wait_for_sweep(queue, poll_interval=0.05)[sweep.DONE] == 1
+
+def test_worker_creates_output_directory(queue, tmp_path, monkeypatch):
+    monkeypatch.setattr(sweep, "run_model", lambda model, payload, *args, **kwargs: {})
+    monkeypatch.setattr(sweep, "save_output", lambda output_data, filename: open(filename, "wb").close())
+
+    publish_sweep(queue, EXPERIMENTS, runs=2, max_iterations=5)
+    output_dir = tmp_path / "new" / "output"
+
+    assert work(queue, None, output_dir=str(output_dir)) == 2
+    assert queue.counts()[sweep.DONE] == 2
+    assert len(os.listdir(str(output_dir))) == 2